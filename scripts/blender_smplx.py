@@ -1,13 +1,20 @@
 import bpy
 import numpy as np
 from mathutils import Vector, Matrix, Euler
-import os
 import math
+import zipfile
+from pathlib import Path
 
 # get context
 scene = bpy.context.scene
 
 armature_name = ""
+if not armature_name:
+    # fall back to the active object
+    active_obj = bpy.context.view_layer.objects.active
+    if active_obj is None or active_obj.type != 'ARMATURE':
+        raise RuntimeError("Set armature_name or make the SMPL-X armature the active object")
+    armature_name = active_obj.name
 armature_obj = bpy.data.objects[armature_name]
 
 # define 22dof body names
@@ -24,6 +31,7 @@ hand_names = ['left_index1', 'left_index2', 'left_index3', 'left_middle1', 'left
 # define 3dof face
 face_names = ['jaw', 'left_eye_smplhf', 'right_eye_smplhf']
 bone_names = body_names + hand_names + face_names
+bone_index = {name: idx for idx, name in enumerate(bone_names)}
 
 # define frame
 start_frame = 0
@@ -34,10 +42,9 @@ num_frames = end_frame - start_frame + 1
 
 root_orient = np.zeros((num_frames, 3), dtype=np.float32) # 根骨骼旋转
 trans = np.zeros((num_frames, 3), dtype=np.float32) # 全局平移
-poses = np.zeros((num_frames, 162), dtype=np.float32) # 姿态 (63 + 90 + 9)
-pose_body = np.zeros((num_frames, 63), dtype=np.float32) # 身体姿态 (21 joints * 3)
-pose_hand = np.zeros((num_frames, 90), dtype=np.float32) # 手部姿态 (30 joints * 3)
-pose_face = np.zeros((num_frames, 9), dtype=np.float32) # 面部姿态 (3 joints * 3)
+pose_all = np.empty((num_frames, 54, 3), dtype=np.float32) # 关节姿态 (54 joints * 3)
+
+bones_tail = bone_names[1:]  # skip pelvis
 
 for frame_id in range(start_frame, end_frame+1):
     if frame_id % 100 == 0:
@@ -58,7 +65,7 @@ for frame_id in range(start_frame, end_frame+1):
     trans[frame_id - start_frame] = pelvis_global_matrix.to_translation()
     
     # poses
-    for bone_name in bone_names[1:]:  # skip pelvis
+    for bone_name in bones_tail:
         pose_bone = armature_obj.pose.bones[bone_name]
         if pose_bone.parent:
             local_matrix = pose_bone.parent.matrix.inverted() @ pose_bone.matrix
@@ -67,14 +74,15 @@ for frame_id in range(start_frame, end_frame+1):
         local_rotation_matrix = local_matrix.to_3x3().normalized()
         local_rotation_quaternion = local_rotation_matrix.to_quaternion()
         axis, angle = local_rotation_quaternion.to_axis_angle()
-        axis_angle = axis * angle
-        joint_index = bone_names.index(bone_name) - 1
-        poses[frame_id - start_frame, joint_index*3:joint_index*3+3] = [axis_angle.x, axis_angle.y, axis_angle.z]
+        joint_index = bone_index[bone_name] - 1
+        # axis * angle, stored straight into the pose buffer
+        np.multiply(axis, angle, out=pose_all[frame_id - start_frame, joint_index])
 
-# split poses into body, hand, face
-pose_body = poses[:, :63]
-pose_hand = poses[:, 63:153]
-pose_face = poses[:, 153:]
+# flatten to poses (63 + 90 + 9), then split into body, hand, face
+poses = pose_all.reshape(num_frames, 162)
+pose_body = poses[:, :63] # 身体姿态 (21 joints * 3)
+pose_hand = poses[:, 63:153] # 手部姿态 (30 joints * 3)
+pose_face = poses[:, 153:] # 面部姿态 (3 joints * 3)
 
 print(f"{root_orient.shape=}")
 print(f"{trans.shape=}")
@@ -94,15 +102,15 @@ smplx_data = {
     'poses': poses,
     'pose_body': pose_body, 
     'pose_hand': pose_hand,
-    'pose_jaw': pose_face,
-    'pose_eye': pose_face,
+    'pose_jaw': pose_face[:, :3],
+    'pose_eye': pose_face[:, 3:],
 }
 
 # save to npz
-home_dir = os.path.expanduser("~")
-documents_dir = os.path.join(home_dir, "Documents")
-save_dir = os.path.join(documents_dir, "SMPLX_motion_data")
-os.makedirs(save_dir, exist_ok=True)
-armature_name = armature_name.replace('.', '-')
-output_path = os.path.join(save_dir, f"{armature_name}.npz")
-np.savez(output_path, **smplx_data)
\ No newline at end of file
+save_dir = Path.home() / "Documents" / "SMPLX_motion_data"
+save_dir.mkdir(parents=True, exist_ok=True)
+output_path = save_dir / f"{armature_name.replace('.', '-')}.npz"
+with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1, allowZip64=True) as zf:
+    for name, arr in smplx_data.items():
+        with zf.open(name + '.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, np.asarray(arr), allow_pickle=False)
@@ -28,12 +28,23 @@ bl_info = {
 
 import bpy
 import numpy as np
-from mathutils import Vector, Matrix, Quaternion
+from mathutils import Vector, Matrix, Quaternion, Euler
 import os
-from bpy.props import StringProperty, IntProperty, PointerProperty
+import sys
+import math
+import time
+import traceback
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from bpy.props import StringProperty, IntProperty, BoolProperty, PointerProperty
 from bpy.types import PropertyGroup, Operator, Panel
 from bpy_extras.io_utils import ExportHelper
 
+# Numba is optional, Blender's bundled Python usually does not ship it
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 # Define joint names
 BODY_NAMES = [
@@ -55,6 +66,275 @@ FACE_NAMES = ['jaw', 'left_eye_smplhf', 'right_eye_smplhf']
 
 BONE_NAMES = BODY_NAMES + HAND_NAMES + FACE_NAMES
 
+# Map bone name -> position in BONE_NAMES
+BONE_INDEX = {name: idx for idx, name in enumerate(BONE_NAMES)}
+
+# Number of exported joints (every bone except pelvis)
+NUM_JOINTS = len(BONE_NAMES) - 1
+
+# Minimum number of frames before the NumPy log map is split across threads
+PARALLEL_MIN_FRAMES = 1024
+
+# Arrays written by an export, also the .npy file names of the separate-file output
+OUTPUT_NAMES = (
+    'gender', 'surface_model_type', 'mocap_frame_rate', 'betas', 'root_orient', 'trans',
+    'poses', 'pose_body', 'pose_hand', 'pose_jaw', 'pose_eye',
+)
+
+# Frames buffered before converting to axis-angle, bounds temporary memory on long captures.
+# One PARALLEL_MIN_FRAMES slice per core, so each chunk still fills the log map thread pool
+CHUNK_FRAMES = (os.cpu_count() or 1) * PARALLEL_MIN_FRAMES
+
+
+def rotmats_to_axis_angle(R, out=None):
+    """Convert a batch of rotation matrices (..., 3, 3) to axis-angle vectors (..., 3), written into out if given"""
+    R = np.asarray(R)
+    if out is None:
+        out = np.empty(R.shape[:-2] + (3,), dtype=np.float64)
+    
+    if njit is None:
+        # Each worker gets at least PARALLEL_MIN_FRAMES frames
+        num_workers = min(os.cpu_count() or 1, max(1, R.shape[0] // PARALLEL_MIN_FRAMES))
+        if R.ndim < 4 or num_workers < 2:
+            out[...] = _log_map_numpy(R)
+            return out
+        
+        # NumPy releases the GIL inside its kernels, so frame chunks run in parallel
+        bounds = np.linspace(0, R.shape[0], num_workers + 1).astype(int)
+        
+        def convert_chunk(start, stop):
+            out[start:stop] = _log_map_numpy(R[start:stop])
+        
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            list(executor.map(convert_chunk, bounds[:-1], bounds[1:]))
+        return out
+    
+    # The kernel writes through a flat view of out
+    if not out.flags.c_contiguous:
+        raise ValueError("out must be C-contiguous")
+    _log_map_numba(np.ascontiguousarray(R, dtype=np.float64).reshape(-1, 3, 3), out.reshape(-1, 3))
+    return out
+
+
+def _log_map_numpy(R):
+    """Vectorized NumPy log map, see rotmats_to_axis_angle"""
+    R = np.asarray(R, dtype=np.float64)
+    
+    # Normalize columns to drop bone scale (same as mathutils Matrix.normalized)
+    R = R / np.linalg.norm(R, axis=-2, keepdims=True)
+    
+    # Log map: the skew-symmetric part holds 2 * sin(theta) * axis
+    vec = np.stack([
+        R[..., 2, 1] - R[..., 1, 2],
+        R[..., 0, 2] - R[..., 2, 0],
+        R[..., 1, 0] - R[..., 0, 1],
+    ], axis=-1)
+    cos_theta = 0.5 * (R[..., 0, 0] + R[..., 1, 1] + R[..., 2, 2] - 1.0)
+    sin_theta_2 = np.linalg.norm(vec, axis=-1)
+    theta = np.arctan2(0.5 * sin_theta_2, cos_theta)
+    
+    # theta / (2 * sin(theta)) tends to 0.5 for small angles
+    small = sin_theta_2 < 1e-8
+    scale = np.where(small, 0.5, theta / np.where(small, 1.0, sin_theta_2))
+    axis_angle = vec * scale[..., None]
+    
+    # Near pi the skew-symmetric part vanishes, recover the axis from the symmetric part
+    near_pi = theta > np.pi - 1e-3
+    if np.any(near_pi):
+        R_pi = R[near_pi]
+        B = 0.5 * (R_pi + np.swapaxes(R_pi, -1, -2)) - cos_theta[near_pi][:, None, None] * np.eye(3)
+        k = np.argmax(np.diagonal(B, axis1=-2, axis2=-1), axis=-1)
+        axis = np.take_along_axis(B, k[:, None, None], axis=-1)[..., 0]
+        axis /= np.linalg.norm(axis, axis=-1, keepdims=True)
+        sign = np.where(np.sum(axis * vec[near_pi], axis=-1) < 0.0, -1.0, 1.0)
+        axis_angle[near_pi] = axis * (sign * theta[near_pi])[:, None]
+    
+    return axis_angle
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _log_map_numba(R, out):
+        """Fused single-pass log map over (N, 3, 3) matrices, same math as _log_map_numpy"""
+        for i in prange(R.shape[0]):
+            # Normalize columns
+            n0 = math.sqrt(R[i, 0, 0] ** 2 + R[i, 1, 0] ** 2 + R[i, 2, 0] ** 2)
+            n1 = math.sqrt(R[i, 0, 1] ** 2 + R[i, 1, 1] ** 2 + R[i, 2, 1] ** 2)
+            n2 = math.sqrt(R[i, 0, 2] ** 2 + R[i, 1, 2] ** 2 + R[i, 2, 2] ** 2)
+            m00, m01, m02 = R[i, 0, 0] / n0, R[i, 0, 1] / n1, R[i, 0, 2] / n2
+            m10, m11, m12 = R[i, 1, 0] / n0, R[i, 1, 1] / n1, R[i, 1, 2] / n2
+            m20, m21, m22 = R[i, 2, 0] / n0, R[i, 2, 1] / n1, R[i, 2, 2] / n2
+            
+            vx, vy, vz = m21 - m12, m02 - m20, m10 - m01
+            c = 0.5 * (m00 + m11 + m22 - 1.0)
+            s2 = math.sqrt(vx * vx + vy * vy + vz * vz)
+            theta = math.atan2(0.5 * s2, c)
+            
+            if theta > math.pi - 1e-3:
+                # Axis from the largest column of the symmetric part
+                b00, b11, b22 = m00 - c, m11 - c, m22 - c
+                if b00 >= b11 and b00 >= b22:
+                    vx, vy, vz = b00, 0.5 * (m10 + m01), 0.5 * (m20 + m02)
+                elif b11 >= b22:
+                    vx, vy, vz = 0.5 * (m01 + m10), b11, 0.5 * (m21 + m12)
+                else:
+                    vx, vy, vz = 0.5 * (m02 + m20), 0.5 * (m12 + m21), b22
+                n = math.sqrt(vx * vx + vy * vy + vz * vz)
+                if vx * (m21 - m12) + vy * (m02 - m20) + vz * (m10 - m01) < 0.0:
+                    n = -n
+                k = theta / n
+            elif s2 < 1e-8:
+                k = 0.5
+            else:
+                k = theta / s2
+            
+            out[i, 0] = vx * k
+            out[i, 1] = vy * k
+            out[i, 2] = vz * k
+
+
+def quat_multiply(a, b):
+    """Hamilton product of quaternion batches (..., 4) in (w, x, y, z) order"""
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ], axis=-1)
+
+
+def quats_to_axis_angle(q, out=None):
+    """Convert a batch of quaternions (..., 4) in (w, x, y, z) order to axis-angle vectors (..., 3), written into out if given"""
+    q = np.asarray(q, dtype=np.float64)
+    q = q / np.linalg.norm(q, axis=-1, keepdims=True)
+    
+    # Keep w >= 0 so angles stay within [0, pi]
+    q = np.where(q[..., :1] < 0.0, -q, q)
+    
+    # theta = 2 * atan2(|xyz|, w), theta / sin(theta / 2) tends to 2 for small angles
+    xyz = q[..., 1:]
+    sin_half = np.linalg.norm(xyz, axis=-1)
+    theta = 2.0 * np.arctan2(sin_half, q[..., 0])
+    small = sin_half < 1e-8
+    scale = np.where(small, 2.0, theta / np.where(small, 1.0, sin_half))
+    if out is None:
+        return xyz * scale[..., None]
+    np.multiply(xyz, scale[..., None], out=out, casting='same_kind')
+    return out
+
+
+def save_npz(output_path, arrays, compress=True):
+    """Write arrays to an NPZ file, streaming each array straight into the zip archive"""
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    compresslevel = 1 if compress else None
+    with zipfile.ZipFile(output_path, 'w', compression=compression, compresslevel=compresslevel, allowZip64=True) as zf:
+        for name, value in arrays.items():
+            with zf.open(name + '.npy', 'w', force_zip64=True) as f:
+                np.lib.format.write_array(f, np.asanyarray(value), allow_pickle=False)
+
+
+def allocate_output(output_dir, name, shape):
+    """Allocate a float32 output array, memory mapped to output_dir/name.npy when output_dir is set"""
+    if output_dir is None:
+        return np.zeros(shape, dtype=np.float32)
+    return np.lib.format.open_memmap(os.path.join(output_dir, name + '.npy'), mode='w+', dtype=np.float32, shape=shape)
+
+
+def remove_npy_dir(output_dir, remove_dir):
+    """Delete the files of a failed separate-file export, and the folder if it was created for it"""
+    for name in OUTPUT_NAMES:
+        path = os.path.join(output_dir, name + '.npy')
+        try:
+            if os.path.isfile(path):
+                os.remove(path)
+        except OSError as e:
+            print(f"Could not remove partial export file {path}: {e}")
+    if remove_dir:
+        try:
+            os.rmdir(output_dir)
+        except OSError:
+            pass
+
+
+def save_npy_dir(output_dir, arrays):
+    """Write arrays as separate .npy files, memory mapped arrays are already in place and only flushed"""
+    for name, value in arrays.items():
+        path = os.path.join(output_dir, name + '.npy')
+        if isinstance(value, np.memmap) and value.filename == os.path.abspath(path):
+            value.flush()
+        else:
+            np.save(path, np.asanyarray(value), allow_pickle=False)
+
+
+def can_sample_fcurves(armature_obj, pose_bones):
+    """Check whether the pose of the given bones is fully defined by the armature's action keyframes"""
+    anim_data = armature_obj.animation_data
+    if not anim_data or not anim_data.action:
+        return False
+    
+    # Drivers, NLA, constraints and object-level animation all need the dependency graph
+    if anim_data.drivers or any(not track.mute for track in anim_data.nla_tracks):
+        return False
+    # A partial or non-replacing action is blended with the rest pose
+    if anim_data.action_influence < 1.0 or anim_data.action_blend_type != 'REPLACE':
+        return False
+    if armature_obj.parent or armature_obj.constraints or armature_obj.data.pose_position != 'POSE':
+        return False
+    if any(not fcurve.data_path.startswith('pose.bones[') for fcurve in anim_data.action.fcurves):
+        return False
+    # Constraints on any bone count, e.g. IK on a helper bone reaches into the exported chain
+    if any(pose_bone.constraints for pose_bone in armature_obj.pose.bones):
+        return False
+    
+    for pose_bone in pose_bones:
+        if pose_bone.rotation_mode == 'AXIS_ANGLE':
+            return False
+        if pose_bone.parent and (not pose_bone.bone.use_inherit_rotation or pose_bone.bone.inherit_scale != 'FULL'):
+            return False
+    
+    return True
+
+
+def get_bone_channels(action, pose_bone, prop):
+    """Get (fcurve, default) pairs for each component of a pose bone property"""
+    data_path = f'pose.bones["{bpy.utils.escape_identifier(pose_bone.name)}"].{prop}'
+    channels = []
+    for index, value in enumerate(getattr(pose_bone, prop)):
+        fcurve = action.fcurves.find(data_path, index=index)
+        if fcurve is not None and fcurve.mute:
+            fcurve = None
+        channels.append((fcurve, value))
+    return channels
+
+
+def evaluate_channels(channels, frame):
+    """Evaluate (fcurve, default) pairs at a frame, unkeyed components keep their default"""
+    return [fcurve.evaluate(frame) if fcurve is not None else value for fcurve, value in channels]
+
+
+def get_rotation_channels(action, pose_bone):
+    """Get the rotation mode and rotation channels of a pose bone"""
+    if pose_bone.rotation_mode == 'QUATERNION':
+        return 'QUATERNION', get_bone_channels(action, pose_bone, 'rotation_quaternion')
+    return pose_bone.rotation_mode, get_bone_channels(action, pose_bone, 'rotation_euler')
+
+
+def evaluate_rotation(rotation_mode, channels, frame):
+    """Evaluate rotation channels at a frame as a 3x3 matrix"""
+    values = evaluate_channels(channels, frame)
+    if rotation_mode == 'QUATERNION':
+        return Quaternion(values).normalized().to_matrix()
+    return Euler(values, rotation_mode).to_matrix()
+
+
+def get_rest_offset(pose_bone):
+    """Get the rest matrix of a bone relative to its parent"""
+    if pose_bone.parent:
+        return pose_bone.parent.bone.matrix_local.inverted() @ pose_bone.bone.matrix_local
+    return pose_bone.bone.matrix_local.copy()
+
 
 class SMPLXExporterProperties(PropertyGroup):
     """Properties for SMPL-X Animation Exporter"""
@@ -100,6 +380,19 @@ class SMPLXExporterProperties(PropertyGroup):
         min=1,
         max=240
     )
+    
+    compress: BoolProperty(
+        name="Compress",
+        description="Compress the NPZ file (smaller files, slightly slower to write)",
+        default=True
+    )
+    
+    split_arrays: BoolProperty(
+        name="Separate NPY Files",
+        description="Write each array as a .npy file in a folder named after the export file instead of a single NPZ. "
+                    "root_orient, trans and poses are filled in place on disk, the per-part poses are written from them",
+        default=False
+    )
 
 
 class SMPLX_OT_ExportAnimation(Operator, ExportHelper):
@@ -128,11 +421,17 @@ class SMPLX_OT_ExportAnimation(Operator, ExportHelper):
             self.report({'ERROR'}, "Please select a valid SMPL-X armature object")
             return {'CANCELLED'}
         
-        # Validate bone names
-        missing_bones = []
-        for bone_name in BONE_NAMES:
-            if bone_name not in armature_obj.pose.bones:
+        # Validate bone names and cache pose bone references (skip pelvis, start from index 1)
+        bones_dict = armature_obj.pose.bones
+        pelvis_bone = bones_dict.get('pelvis')
+        missing_bones = [] if pelvis_bone is not None else ['pelvis']
+        bone_refs = []
+        for bone_name in BONE_NAMES[1:]:
+            pose_bone = bones_dict.get(bone_name)
+            if pose_bone is None:
                 missing_bones.append(bone_name)
+                continue
+            bone_refs.append((BONE_INDEX[bone_name] - 1, pose_bone, pose_bone.parent))
         
         if missing_bones:
             self.report({'WARNING'}, f"Missing bones: {', '.join(missing_bones[:5])}... Continuing with available bones")
@@ -146,10 +445,10 @@ class SMPLX_OT_ExportAnimation(Operator, ExportHelper):
             self.report({'ERROR'}, "Invalid frame range")
             return {'CANCELLED'}
         
-        # Initialize arrays
-        root_orient = np.zeros((num_frames, 3), dtype=np.float32)
-        trans = np.zeros((num_frames, 3), dtype=np.float32)
-        poses = np.zeros((num_frames, 162), dtype=np.float32)
+        # Separate .npy output writes the large arrays in place through memory maps
+        output_path = self.filepath
+        output_dir = os.path.splitext(output_path)[0] if props.split_arrays else None
+        output_ready = False
         
         scene = context.scene
         
@@ -158,53 +457,165 @@ class SMPLX_OT_ExportAnimation(Operator, ExportHelper):
         wm.progress_begin(0, 100)
         
         try:
+            if output_dir is not None:
+                created_dir = not os.path.isdir(output_dir)
+                try:
+                    os.makedirs(output_dir, exist_ok=True)
+                except FileExistsError:
+                    self.report({'ERROR'}, f"Cannot create export folder, a file already exists at {output_dir}")
+                    return {'CANCELLED'}
+                output_ready = True
+            
+            # Initialize arrays
+            root_orient = allocate_output(output_dir, 'root_orient', (num_frames, 3))
+            trans = allocate_output(output_dir, 'trans', (num_frames, 3))
+            poses = allocate_output(output_dir, 'poses', (num_frames, NUM_JOINTS * 3))
+            # Pelvis world matrices, split into root_orient and trans after sampling
+            pelvis_world = np.empty((num_frames, 4, 4), dtype=np.float64)
+            
+            # Read keyframes straight from the action when nothing else affects the pose,
+            # which avoids a full dependency graph evaluation per frame
+            # (the pelvis is rebuilt in world space, so it must not have a parent bone, and its
+            # location must be in the bone's local space as matrix_local @ LocRotScale assumes)
+            sampled_bones = [pose_bone for _, pose_bone, _ in bone_refs]
+            if pelvis_bone is not None:
+                sampled_bones.append(pelvis_bone)
+            use_fcurves = can_sample_fcurves(armature_obj, sampled_bones)
+            if pelvis_bone is not None and (pelvis_bone.parent or not pelvis_bone.bone.use_local_location):
+                use_fcurves = False
+            
+            # Joint rotations are buffered per chunk of frames and converted when the chunk is full
+            chunk_frames = min(num_frames, CHUNK_FRAMES)
+            
+            if use_fcurves:
+                print("Sampling action fcurves directly")
+                action = armature_obj.animation_data.action
+                # Split bones by rotation mode so each frame loop is specialized
+                quat_refs = []
+                euler_refs = []
+                for joint_index, pose_bone, _ in bone_refs:
+                    rotation_mode, channels = get_rotation_channels(action, pose_bone)
+                    if rotation_mode == 'QUATERNION':
+                        quat_refs.append((joint_index, channels))
+                    else:
+                        euler_refs.append((joint_index, rotation_mode, channels))
+                
+                # Local rotation is rest offset @ basis rotation, composed as quaternions per
+                # chunk. Missing joints keep the identity
+                rest_q = np.zeros((NUM_JOINTS, 4), dtype=np.float64)
+                rest_q[:, 0] = 1.0
+                for joint_index, pose_bone, _ in bone_refs:
+                    rest_q[joint_index] = get_rest_offset(pose_bone).to_quaternion()
+                basis_q = np.zeros((chunk_frames, NUM_JOINTS, 4), dtype=np.float32)
+                basis_q[..., 0] = 1.0
+                if pelvis_bone is not None:
+                    pelvis_rest = pelvis_bone.bone.matrix_local.copy()
+                    pelvis_location = get_bone_channels(action, pelvis_bone, 'location')
+                    pelvis_rotation = get_rotation_channels(action, pelvis_bone)
+            else:
+                # Record armature-space rotations per frame and resolve parent-relative
+                # rotations per chunk. Slots hold the joints first, then any parent
+                # bone that is not a joint itself (e.g. pelvis)
+                slot_bones = [pose_bone for _, pose_bone, _ in bone_refs]
+                slot_index = {pose_bone.name: slot for slot, pose_bone in enumerate(slot_bones)}
+                parent_slot = []
+                for _, _, parent in bone_refs:
+                    if parent is None:
+                        parent_slot.append(-1)
+                        continue
+                    if parent.name not in slot_index:
+                        slot_index[parent.name] = len(slot_bones)
+                        slot_bones.append(parent)
+                    parent_slot.append(slot_index[parent.name])
+                parent_slot = np.array(parent_slot, dtype=np.intp)
+                joint_indices = np.array([joint_index for joint_index, _, _ in bone_refs], dtype=np.intp)
+                raw_R = np.empty((chunk_frames, len(slot_bones), 3, 3), dtype=np.float32)
+                
+                # Bones are read from the evaluated armature, by position in its pose bone list
+                depsgraph = context.evaluated_depsgraph_get()
+                slot_positions = [bones_dict.find(pose_bone.name) for pose_bone in slot_bones]
+                pelvis_position = bones_dict.find('pelvis')
+                
+                # Local joint rotations, missing joints keep the identity
+                local_R = np.empty((chunk_frames, NUM_JOINTS, 3, 3), dtype=np.float32)
+                local_R[:] = np.eye(3, dtype=np.float32)
+            
+            pose_all = poses.reshape(num_frames, NUM_JOINTS, 3)
+            
+            def convert_chunk(start, stop):
+                """Convert the buffered frames [start, stop) to axis-angle joint poses"""
+                count = stop - start
+                if use_fcurves:
+                    quats_to_axis_angle(quat_multiply(rest_q, basis_q[:count]), out=pose_all[start:stop])
+                    return
+                
+                # Local rotation is parent^-1 @ child, bones without a parent keep their own rotation
+                if bone_refs:
+                    chunk_R = raw_R[:count]
+                    parent_R = np.where(
+                        (parent_slot >= 0)[None, :, None, None],
+                        chunk_R[:, parent_slot],
+                        np.eye(3, dtype=np.float32),
+                    )
+                    local_R[:count, joint_indices] = np.einsum(
+                        'fjab,fjbc->fjac', np.linalg.inv(parent_R), chunk_R[:, :len(bone_refs)]
+                    )
+                rotmats_to_axis_angle(local_R[:count], out=pose_all[start:stop])
+            
             # Extract animation data
+            sample_start = time.perf_counter()
+            chunk_start = 0
+            last_progress = -1
+            log_interval = 200 if num_frames > 10000 else 50
             for frame_idx, frame_id in enumerate(range(start_frame, end_frame + 1)):
-                # Update progress bar
+                # Update progress bar only when the percentage changes, each update redraws the UI
                 progress = int((frame_idx / num_frames) * 100)
-                wm.progress_update(progress)
+                if progress != last_progress:
+                    wm.progress_update(progress)
+                    last_progress = progress
                 
-                if frame_idx % 50 == 0:
+                if frame_idx % log_interval == 0:
                     print(f"Processing frame {frame_id}/{end_frame} ({frame_idx}/{num_frames}) - {progress}%")
                 
-                scene.frame_set(frame_id)
-                context.view_layer.update()
-                
-                # Extract root orientation and translation
-                if 'pelvis' in armature_obj.pose.bones:
-                    pelvis_bone = armature_obj.pose.bones['pelvis']
-                    pelvis_global_matrix = armature_obj.matrix_world @ pelvis_bone.matrix
+                row = frame_idx - chunk_start
+                if use_fcurves:
+                    # Evaluate keyframes directly, the scene frame is left untouched
+                    M_world = armature_obj.matrix_world
+                    if pelvis_bone is not None:
+                        pelvis_basis = Matrix.LocRotScale(
+                            evaluate_channels(pelvis_location, frame_id),
+                            evaluate_rotation(*pelvis_rotation, frame_id),
+                            None,
+                        )
+                        pelvis_world[frame_idx] = M_world @ pelvis_rest @ pelvis_basis
                     
-                    # Root orientation (axis-angle)
-                    rotation_matrix = pelvis_global_matrix.to_3x3().normalized()
-                    rotation_quaternion = rotation_matrix.to_quaternion()
-                    axis, angle = rotation_quaternion.to_axis_angle()
-                    root_orient[frame_idx] = axis * angle
+                    for joint_index, channels in quat_refs:
+                        basis_q[row, joint_index] = evaluate_channels(channels, frame_id)
+                    for joint_index, rotation_mode, channels in euler_refs:
+                        euler = Euler(evaluate_channels(channels, frame_id), rotation_mode)
+                        basis_q[row, joint_index] = euler.to_quaternion()
+                else:
+                    # frame_set already updates the dependency graph
+                    scene.frame_set(frame_id)
+                    armature_eval = armature_obj.evaluated_get(depsgraph)
+                    eval_bones = armature_eval.pose.bones[:]
+                    if pelvis_bone is not None:
+                        pelvis_world[frame_idx] = armature_eval.matrix_world @ eval_bones[pelvis_position].matrix
                     
-                    # Translation
-                    trans[frame_idx] = pelvis_global_matrix.to_translation()
+                    # Extract armature-space bone rotations
+                    for slot, position in enumerate(slot_positions):
+                        raw_R[row, slot] = eval_bones[position].matrix.to_3x3()
                 
-                # Extract joint poses (skip pelvis, start from index 1)
-                for bone_name in BONE_NAMES[1:]:
-                    if bone_name not in armature_obj.pose.bones:
-                        continue
-                    
-                    pose_bone = armature_obj.pose.bones[bone_name]
-                    
-                    # Get local rotation
-                    if pose_bone.parent:
-                        local_matrix = pose_bone.parent.matrix.inverted() @ pose_bone.matrix
-                    else:
-                        local_matrix = pose_bone.matrix
-                    
-                    local_rotation_matrix = local_matrix.to_3x3().normalized()
-                    local_rotation_quaternion = local_rotation_matrix.to_quaternion()
-                    axis, angle = local_rotation_quaternion.to_axis_angle()
-                    axis_angle = axis * angle
-                    
-                    # Store in poses array
-                    joint_index = BONE_NAMES.index(bone_name) - 1
-                    poses[frame_idx, joint_index*3:joint_index*3+3] = [axis_angle.x, axis_angle.y, axis_angle.z]
+                if row == chunk_frames - 1 or frame_idx == num_frames - 1:
+                    convert_chunk(chunk_start, frame_idx + 1)
+                    chunk_start = frame_idx + 1
+            
+            print(f"Sampled {num_frames} frames in {time.perf_counter() - sample_start:.2f}s")
+            
+            # Extract root orientation (axis-angle) and translation
+            if pelvis_bone is not None:
+                rotmats_to_axis_angle(pelvis_world[:, :3, :3], out=root_orient)
+                trans[:] = pelvis_world[:, :3, 3]
             
             # Split poses into body, hand, face
             pose_body = poses[:, :63]
@@ -214,23 +625,27 @@ class SMPLX_OT_ExportAnimation(Operator, ExportHelper):
             # Create SMPL-X data dictionary
             betas = np.zeros((16,), dtype=np.float32)
             smplx_data = {
-                'gender': 'neutral',
-                'surface_model_type': 'smplx',
-                'mocap_frame_rate': props.mocap_framerate,
+                'gender': np.array('neutral'),
+                'surface_model_type': np.array('smplx'),
+                'mocap_frame_rate': np.array(props.mocap_framerate),
                 'betas': betas,
                 'root_orient': root_orient,
                 'trans': trans,
                 'poses': poses,
                 'pose_body': pose_body,
                 'pose_hand': pose_hand,
-                'pose_jaw': pose_face,
-                'pose_eye': pose_face,
+                'pose_jaw': pose_face[:, :3],
+                'pose_eye': pose_face[:, 3:],
             }
             
-            # Save to NPZ (this might take a moment for large files)
-            print("Saving NPZ file...")
-            output_path = self.filepath
-            np.savez(output_path, **smplx_data)
+            if output_dir is not None:
+                print("Saving NPY files...")
+                save_npy_dir(output_dir, smplx_data)
+                output_path = output_dir
+            else:
+                # Save to NPZ (this might take a moment for large files)
+                print("Saving NPZ file...")
+                save_npz(output_path, smplx_data, compress=props.compress)
             
             self.report({'INFO'}, f"Successfully exported animation to {output_path}")
             print(f"Exported SMPL-X animation:")
@@ -240,6 +655,17 @@ class SMPLX_OT_ExportAnimation(Operator, ExportHelper):
             print(f"  - Poses shape: {poses.shape}")
             print(f"  - Output: {output_path}")
             
+        except BaseException:
+            # Don't leave half-written files that look like a valid export
+            if output_ready:
+                # Windows cannot delete a file that is still mapped, so drop every view of the
+                # memory maps first, including those held by the frames of the traceback
+                root_orient = trans = poses = pose_all = None
+                pose_body = pose_hand = pose_face = smplx_data = None
+                traceback.clear_frames(sys.exc_info()[2])
+                remove_npy_dir(output_dir, created_dir)
+            raise
+            
         finally:
             # Always end progress bar
             wm.progress_end()
@@ -394,6 +820,10 @@ class SMPLX_PT_ExporterPanel(Panel):
         box = layout.box()
         box.label(text="3. Export Settings", icon='SETTINGS')
         box.prop(props, "mocap_framerate")
+        box.prop(props, "split_arrays")
+        row = box.row()
+        row.active = not props.split_arrays
+        row.prop(props, "compress")
         
         layout.separator()
         